@@ -4,23 +4,49 @@ Avaliação Estética Facial com MediaPipe Face Mesh
 Extrai métricas clínicas objetivas a partir de uma foto.
 
 Instalação:
-    pip install mediapipe opencv-python numpy matplotlib
+    pip install mediapipe opencv-python numpy
+    pip install numba        # opcional, compila o núcleo de extract_metrics
+    pip install orjson       # opcional, grava o JSON de métricas mais rápido
+    pip install matplotlib   # opcional, só para --chart mpl
+    pip install onnxruntime  # opcional, só para --onnx-model
+    pip install "ray[data]"  # opcional, só para ray_batch_analyze
 
 Uso:
     python facial_analysis.py --image foto.jpg
+    python facial_analysis.py --image foto.jpg --chart
+    python facial_analysis.py --image sessao/*.jpg --session
 """
 
 import argparse
+import functools
 import math
 import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
-import mediapipe as mp
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
 from dataclasses import dataclass, asdict
+from enum import IntEnum
+from types import SimpleNamespace
 from typing import Optional
 
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele o JSON sai pelo módulo json
+    orjson = None
+
+try:
+    from numba import njit, vectorize
+except ImportError:  # numba é opcional: sem ele o núcleo numérico roda em Python puro
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+
+    def vectorize(*args, **kwargs):
+        return lambda fn: fn
+
 # ---------------------------------------------------------------------------
 # Índices dos landmarks relevantes (MediaPipe 468-point model)
 # ---------------------------------------------------------------------------
@@ -71,29 +97,90 @@ LM = {
     "malar_right":    345,
 }
 
+# Tabela de índices congelada no carregamento: _LM_IDX[row] é o landmark do
+# MediaPipe que ocupa a linha `row` da matriz (K, 2) usada nas métricas,
+# e LMRow.<NOME> dá essa linha (ex.: LMRow.CHIN)
+_LM_NAMES = tuple(LM.keys())
+_LM_IDX = np.fromiter(LM.values(), dtype=np.int32, count=len(LM))
+LMRow = IntEnum("LMRow", [(name.upper(), row) for row, name in enumerate(_LM_NAMES)])
+
+# Pares homólogos esquerda/direita (linhas de LMRow) usados na assimetria global
+_ASYM_L = np.array([LMRow.EYE_LEFT_OUTER,  LMRow.ALA_LEFT,  LMRow.MALAR_LEFT,
+                    LMRow.LIP_LEFT,  LMRow.BROW_LEFT_PEAK], dtype=np.int64)
+_ASYM_R = np.array([LMRow.EYE_RIGHT_OUTER, LMRow.ALA_RIGHT, LMRow.MALAR_RIGHT,
+                    LMRow.LIP_RIGHT, LMRow.BROW_RIGHT_PEAK], dtype=np.int64)
+
 
 # ---------------------------------------------------------------------------
 # Utilitários
 # ---------------------------------------------------------------------------
 
-def px(lm_result, idx: int, w: int, h: int) -> tuple[float, float]:
+@dataclass
+class Landmarks:
+    """Landmarks de um rosto em pixels, copiados do resultado do MediaPipe uma única vez."""
+    xy: np.ndarray                # (N, 2) — coluna 0 = x, coluna 1 = y
+
+    @classmethod
+    def from_result(cls, lm_result, w: int, h: int) -> "Landmarks":
+        """Aceita o NormalizedLandmarkList do MediaPipe ou uma matriz (N, 2|3) normalizada."""
+        if isinstance(lm_result, Landmarks):
+            return lm_result
+        if isinstance(lm_result, np.ndarray):
+            return cls(lm_result[:, :2].astype(np.float64) * (w, h))
+        xy = np.array([[p.x, p.y] for p in lm_result.landmark], dtype=np.float64)
+        xy *= (w, h)
+        return cls(xy)
+
+
+def px(xy: np.ndarray, idx: int) -> tuple[float, float]:
     """Retorna coordenadas em pixels de um landmark."""
-    pt = lm_result.landmark[idx]
-    return pt.x * w, pt.y * h
+    x, y = xy[idx]
+    return float(x), float(y)
+
 
+def dist(xy: np.ndarray, i: int, j: int) -> float:
+    return math.hypot(xy[j, 0] - xy[i, 0], xy[j, 1] - xy[i, 1])
 
-def dist(a: tuple, b: tuple) -> float:
-    return math.hypot(b[0] - a[0], b[1] - a[1])
 
+def _hypot4_kernel(ax, ay, bx, by):
+    """Distância (a, b) elemento a elemento; com numba vira um loop SIMD compilado."""
+    dx = bx - ax
+    dy = by - ay
+    return np.sqrt(dx * dx + dy * dy)
 
-def angle_deg(a: tuple, vertex: tuple, b: tuple) -> float:
+
+@functools.lru_cache(maxsize=1)
+def _hypot4():
+    # Montar um ufunc do numba custa ~20 ms: só na primeira chamada a dists,
+    # nunca no import do módulo
+    return vectorize(cache=True)(_hypot4_kernel)
+
+
+def dists(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """Versão vetorial de dist: distâncias entre as linhas de A e B, matrizes (N, 2)."""
+    return _hypot4()(A[:, 0], A[:, 1], B[:, 0], B[:, 1])
+
+
+def angle_deg(xy: np.ndarray, a: int, vertex: int, b: int) -> float:
     """Ângulo em graus no vértice formado por a-vertex-b."""
-    v1 = (a[0] - vertex[0], a[1] - vertex[1])
-    v2 = (b[0] - vertex[0], b[1] - vertex[1])
+    v1 = xy[a] - xy[vertex]
+    v2 = xy[b] - xy[vertex]
     cos_a = (v1[0]*v2[0] + v1[1]*v2[1]) / (math.hypot(*v1) * math.hypot(*v2) + 1e-9)
     return math.degrees(math.acos(max(-1, min(1, cos_a))))
 
 
+def angles_deg(A: np.ndarray, V: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """Versão vetorial de angle_deg: ângulos em graus nos vértices V[i] de A[i]-V[i]-B[i].
+
+    A, V e B são matrizes (N, 2) — ex.: xy[[a1, a2]], xy[[v1, v2]], xy[[b1, b2]].
+    """
+    v1 = A - V
+    v2 = B - V
+    cos_a = np.einsum("ij,ij->i", v1, v2) / (
+        np.linalg.norm(v1, axis=1) * np.linalg.norm(v2, axis=1) + 1e-9)
+    return np.degrees(np.arccos(np.clip(cos_a, -1, 1)))
+
+
 # ---------------------------------------------------------------------------
 # Dataclass de resultados
 # ---------------------------------------------------------------------------
@@ -146,168 +233,181 @@ class FacialMetrics:
     global_asymmetry_px: float
 
 
+# Casas decimais de cada campo de FacialMetrics, na ordem de declaração
+_METRIC_DECIMALS = np.array([
+    1, 1, 3,                      # proporções gerais
+    1, 1, 1,                      # terços
+    1, 1, 1, 1, 1,                # quintos
+    1, 1, 1, 1,                   # olhos
+    1, 1, 1,                      # sobrancelhas
+    1, 1, 3,                      # nariz
+    1, 1, 3, 3,                   # lábios
+    1,                            # mento
+    1,                            # simetria global
+])
+_METRIC_SCALE = 10.0 ** _METRIC_DECIMALS
+
+
 # ---------------------------------------------------------------------------
 # Extração de métricas
 # ---------------------------------------------------------------------------
 
-def extract_metrics(lm_result, w: int, h: int) -> FacialMetrics:
-    g = lambda key: px(lm_result, LM[key], w, h)
-
-    # Pontos principais
-    forehead  = g("forehead_top")
-    glabela   = g("glabela")
-    nas_base  = g("nasal_base")
-    chin      = g("chin")
-    jaw_l     = g("jaw_left")
-    jaw_r     = g("jaw_right")
+@njit(cache=True, fastmath=True, nogil=True)
+def _compute_metrics_core(pts: np.ndarray) -> tuple:
+    """Núcleo numérico de extract_metrics; pts é a matriz (K, 2) em pixels, na ordem de LMRow."""
+    R = LMRow
 
-    face_w = dist(jaw_l, jaw_r)
-    face_h = dist(forehead, chin)
+    # --- Proporções gerais ---
+    face_w = math.hypot(pts[R.JAW_RIGHT, 0] - pts[R.JAW_LEFT, 0],
+                        pts[R.JAW_RIGHT, 1] - pts[R.JAW_LEFT, 1])
+    face_h = math.hypot(pts[R.CHIN, 0] - pts[R.FOREHEAD_TOP, 0],
+                        pts[R.CHIN, 1] - pts[R.FOREHEAD_TOP, 1])
+    facial_idx = face_h / (face_w + 1e-9)
 
     # --- Terços ---
-    t_upper  = dist(forehead, glabela)
-    t_middle = dist(glabela, nas_base)
-    t_lower  = dist(nas_base, chin)
+    t_upper  = math.hypot(pts[R.GLABELA, 0] - pts[R.FOREHEAD_TOP, 0],
+                          pts[R.GLABELA, 1] - pts[R.FOREHEAD_TOP, 1])
+    t_middle = math.hypot(pts[R.NASAL_BASE, 0] - pts[R.GLABELA, 0],
+                          pts[R.NASAL_BASE, 1] - pts[R.GLABELA, 1])
+    t_lower  = math.hypot(pts[R.CHIN, 0] - pts[R.NASAL_BASE, 0],
+                          pts[R.CHIN, 1] - pts[R.NASAL_BASE, 1])
     total_t  = t_upper + t_middle + t_lower
 
     # --- Quintos ---
-    el_out = g("eye_left_outer")
-    el_in  = g("eye_left_inner")
-    er_in  = g("eye_right_inner")
-    er_out = g("eye_right_outer")
-
-    f1 = el_out[0] - jaw_l[0]
-    f2 = dist(el_out, el_in)
-    f3 = dist(el_in, er_in)   # quinto central
-    f4 = dist(er_in, er_out)
-    f5 = jaw_r[0] - er_out[0]
+    f1 = pts[R.EYE_LEFT_OUTER, 0] - pts[R.JAW_LEFT, 0]
+    f2 = math.hypot(pts[R.EYE_LEFT_INNER, 0] - pts[R.EYE_LEFT_OUTER, 0],
+                    pts[R.EYE_LEFT_INNER, 1] - pts[R.EYE_LEFT_OUTER, 1])
+    f3 = math.hypot(pts[R.EYE_RIGHT_INNER, 0] - pts[R.EYE_LEFT_INNER, 0],
+                    pts[R.EYE_RIGHT_INNER, 1] - pts[R.EYE_LEFT_INNER, 1])
+    f4 = math.hypot(pts[R.EYE_RIGHT_OUTER, 0] - pts[R.EYE_RIGHT_INNER, 0],
+                    pts[R.EYE_RIGHT_OUTER, 1] - pts[R.EYE_RIGHT_INNER, 1])
+    f5 = pts[R.JAW_RIGHT, 0] - pts[R.EYE_RIGHT_OUTER, 0]
     total_f = f1 + f2 + f3 + f4 + f5
 
     # --- Olhos ---
-    eye_l_w = dist(g("eye_left_outer"),  g("eye_left_inner"))
-    eye_r_w = dist(g("eye_right_outer"), g("eye_right_inner"))
+    eye_l_w = f2
+    eye_r_w = f4
     eye_sym = abs(eye_l_w - eye_r_w) / max(eye_l_w, eye_r_w) * 100
 
-    pupil_l = ((el_out[0]+el_in[0])/2, (g("eye_left_top")[1]+g("eye_left_bot")[1])/2)
-    pupil_r = ((er_out[0]+er_in[0])/2, (g("eye_right_top")[1]+g("eye_right_bot")[1])/2)
-    ipd = dist(pupil_l, pupil_r)
+    pupil_l_x = (pts[R.EYE_LEFT_OUTER, 0] + pts[R.EYE_LEFT_INNER, 0]) / 2
+    pupil_l_y = (pts[R.EYE_LEFT_TOP, 1] + pts[R.EYE_LEFT_BOT, 1]) / 2
+    pupil_r_x = (pts[R.EYE_RIGHT_OUTER, 0] + pts[R.EYE_RIGHT_INNER, 0]) / 2
+    pupil_r_y = (pts[R.EYE_RIGHT_TOP, 1] + pts[R.EYE_RIGHT_BOT, 1]) / 2
+    ipd = math.hypot(pupil_r_x - pupil_l_x, pupil_r_y - pupil_l_y)
 
     # --- Sobrancelhas ---
-    brow_l_h = dist(g("brow_left_peak"),  g("eye_left_outer"))
-    brow_r_h = dist(g("brow_right_peak"), g("eye_right_outer"))
+    brow_l_h = math.hypot(pts[R.EYE_LEFT_OUTER, 0] - pts[R.BROW_LEFT_PEAK, 0],
+                          pts[R.EYE_LEFT_OUTER, 1] - pts[R.BROW_LEFT_PEAK, 1])
+    brow_r_h = math.hypot(pts[R.EYE_RIGHT_OUTER, 0] - pts[R.BROW_RIGHT_PEAK, 0],
+                          pts[R.EYE_RIGHT_OUTER, 1] - pts[R.BROW_RIGHT_PEAK, 1])
     brow_sym = abs(brow_l_h - brow_r_h) / max(brow_l_h, brow_r_h) * 100
 
     # --- Nariz ---
-    nas_w = dist(g("ala_left"), g("ala_right"))
-    nas_h = dist(g("nasal_tip"), g("nasal_base"))
+    nas_w = math.hypot(pts[R.ALA_RIGHT, 0] - pts[R.ALA_LEFT, 0],
+                       pts[R.ALA_RIGHT, 1] - pts[R.ALA_LEFT, 1])
+    nas_h = math.hypot(pts[R.NASAL_BASE, 0] - pts[R.NASAL_TIP, 0],
+                       pts[R.NASAL_BASE, 1] - pts[R.NASAL_TIP, 1])
     nas_idx = nas_w / (nas_h + 1e-9)
 
     # --- Lábios ---
-    lip_w = dist(g("lip_left"), g("lip_right"))
-    lip_h = dist(g("lip_top"), g("lip_bot"))
+    lip_w = math.hypot(pts[R.LIP_RIGHT, 0] - pts[R.LIP_LEFT, 0],
+                       pts[R.LIP_RIGHT, 1] - pts[R.LIP_LEFT, 1])
+    lip_h = math.hypot(pts[R.LIP_BOT, 0] - pts[R.LIP_TOP, 0],
+                       pts[R.LIP_BOT, 1] - pts[R.LIP_TOP, 1])
     lip_idx = lip_w / (lip_h + 1e-9)
 
     # Proporção superior/inferior do lábio
-    lip_mid_y = (g("lip_top")[1] + g("lip_bot")[1]) / 2
-    upper_h = abs(g("cupid_left")[1] - g("lip_top")[1])
-    lower_h = abs(g("lip_bot")[1] - lip_mid_y)
+    lip_mid_y = (pts[R.LIP_TOP, 1] + pts[R.LIP_BOT, 1]) / 2
+    upper_h = abs(pts[R.CUPID_LEFT, 1] - pts[R.LIP_TOP, 1])
+    lower_h = abs(pts[R.LIP_BOT, 1] - lip_mid_y)
     ul_ratio = upper_h / (lower_h + 1e-9)
 
     # --- Mento ---
-    chin_h = dist(nas_base, chin)
-    chin_proj = dist(g("mento"), chin) / (chin_h + 1e-9) * 100
+    mento_h = math.hypot(pts[R.CHIN, 0] - pts[R.MENTO, 0],
+                         pts[R.CHIN, 1] - pts[R.MENTO, 1])
+    chin_proj = mento_h / (t_lower + 1e-9) * 100
 
     # --- Assimetria global ---
-    pairs = [
-        (g("eye_left_outer"),  g("eye_right_outer")),
-        (g("ala_left"),        g("ala_right")),
-        (g("malar_left"),      g("malar_right")),
-        (g("lip_left"),        g("lip_right")),
-        (g("brow_left_peak"),  g("brow_right_peak")),
-    ]
-    # Espelha o lado direito e calcula desvio vertical
-    asym_vals = [abs(l[1] - r[1]) for l, r in pairs]
-    global_asym = float(np.mean(asym_vals))
-
-    return FacialMetrics(
-        face_width_px=round(face_w, 1),
-        face_height_px=round(face_h, 1),
-        facial_index=round(face_h / (face_w + 1e-9), 3),
-
-        third_upper_pct=round(t_upper / total_t * 100, 1),
-        third_middle_pct=round(t_middle / total_t * 100, 1),
-        third_lower_pct=round(t_lower / total_t * 100, 1),
-
-        fifth_1_pct=round(f1 / total_f * 100, 1),
-        fifth_2_pct=round(f2 / total_f * 100, 1),
-        fifth_3_pct=round(f3 / total_f * 100, 1),
-        fifth_4_pct=round(f4 / total_f * 100, 1),
-        fifth_5_pct=round(f5 / total_f * 100, 1),
-
-        eye_left_width_px=round(eye_l_w, 1),
-        eye_right_width_px=round(eye_r_w, 1),
-        eye_symmetry_pct=round(eye_sym, 1),
-        interpupillary_dist_px=round(ipd, 1),
-
-        brow_left_height_px=round(brow_l_h, 1),
-        brow_right_height_px=round(brow_r_h, 1),
-        brow_symmetry_pct=round(brow_sym, 1),
-
-        nasal_width_px=round(nas_w, 1),
-        nasal_height_px=round(nas_h, 1),
-        nasal_index=round(nas_idx, 3),
-
-        lip_width_px=round(lip_w, 1),
-        lip_height_px=round(lip_h, 1),
-        lip_index=round(lip_idx, 3),
-        upper_lower_lip_ratio=round(ul_ratio, 3),
-
-        chin_projection_pct=round(chin_proj, 1),
-
-        global_asymmetry_px=round(global_asym, 1),
+    # Desvio vertical médio entre pares homólogos esquerda/direita
+    global_asym = np.abs(pts[_ASYM_L, 1] - pts[_ASYM_R, 1]).mean()
+
+    return (
+        face_w, face_h, facial_idx,
+        t_upper / total_t * 100, t_middle / total_t * 100, t_lower / total_t * 100,
+        f1 / total_f * 100, f2 / total_f * 100, f3 / total_f * 100,
+        f4 / total_f * 100, f5 / total_f * 100,
+        eye_l_w, eye_r_w, eye_sym, ipd,
+        brow_l_h, brow_r_h, brow_sym,
+        nas_w, nas_h, nas_idx,
+        lip_w, lip_h, lip_idx, ul_ratio,
+        chin_proj,
+        global_asym,
     )
 
 
+def extract_metrics(lm_result, w: int, h: int) -> FacialMetrics:
+    # Todos os pontos necessários numa única matriz (K, 2) em pixels
+    lms = Landmarks.from_result(lm_result, w, h)
+    pts = lms.xy[_LM_IDX]
+
+    raw = np.array(_compute_metrics_core(pts), dtype=np.float64)
+    return FacialMetrics(*(np.round(raw * _METRIC_SCALE) / _METRIC_SCALE).tolist())
+
+
 # ---------------------------------------------------------------------------
 # Visualização anotada
 # ---------------------------------------------------------------------------
 
+# Deslocamentos (dx, dy) de um disco preenchido de raio 2 px
+_DOT_OFFSETS = np.array(
+    [(dx, dy) for dy in range(-2, 3) for dx in range(-2, 3) if dx*dx + dy*dy <= 4],
+    dtype=np.int32,
+)
+
+
 def draw_annotations(image: np.ndarray, lm_result, w: int, h: int) -> np.ndarray:
     img = image.copy()
-    g = lambda key: tuple(map(int, px(lm_result, LM[key], w, h)))
+    # Coordenadas inteiras de cada landmark, calculadas uma única vez
+    lms = Landmarks.from_result(lm_result, w, h)
+    pts = lms.xy[_LM_IDX].astype(np.int32)
+    Pi = [tuple(p) for p in pts.tolist()]
+    R = LMRow
 
     color_line  = (0, 220, 180)
     color_point = (255, 80, 80)
     color_text  = (255, 255, 255)
     font = cv2.FONT_HERSHEY_SIMPLEX
 
-    def pt(key): return g(key)
-    def line(k1, k2, c=color_line, t=1):
-        cv2.line(img, pt(k1), pt(k2), c, t, cv2.LINE_AA)
-    def circle(k, r=4):
-        cv2.circle(img, pt(k), r, color_point, -1, cv2.LINE_AA)
+    def pt(row): return Pi[row]
+    def line(r1, r2, c=color_line, t=1):
+        cv2.line(img, pt(r1), pt(r2), c, t, cv2.LINE_AA)
+    def circle(row, r=4):
+        cv2.circle(img, pt(row), r, color_point, -1, cv2.LINE_AA)
     def label(text, pos, scale=0.35):
         cv2.putText(img, text, pos, font, scale, (0,0,0), 3, cv2.LINE_AA)
         cv2.putText(img, text, pos, font, scale, color_text, 1, cv2.LINE_AA)
 
     # Linhas dos terços
-    line("forehead_top", "jaw_left",  (180,180,180))
-    line("glabela",      "jaw_left",  (180,180,180))
-    line("nasal_base",   "jaw_left",  (180,180,180))
-    for key in ["forehead_top","glabela","nasal_base","chin"]:
-        circle(key)
-
-    # Marcadores de unidades
-    for key in LM:
-        cv2.circle(img, g(key), 2, (0,200,255), -1, cv2.LINE_AA)
+    line(R.FOREHEAD_TOP, R.JAW_LEFT, (180,180,180))
+    line(R.GLABELA,      R.JAW_LEFT, (180,180,180))
+    line(R.NASAL_BASE,   R.JAW_LEFT, (180,180,180))
+    for row in [R.FOREHEAD_TOP, R.GLABELA, R.NASAL_BASE, R.CHIN]:
+        circle(row)
+
+    # Marcadores de unidades — todos os discos de 2 px numa única escrita
+    dots = (pts[:, None, :] + _DOT_OFFSETS).reshape(-1, 2)
+    inside = ((dots[:, 0] >= 0) & (dots[:, 0] < img.shape[1]) &
+              (dots[:, 1] >= 0) & (dots[:, 1] < img.shape[0]))
+    dots = dots[inside]
+    img[dots[:, 1], dots[:, 0]] = (0, 200, 255)
 
     # Labels
-    label("Terco Sup", (pt("glabela")[0]+5, (pt("forehead_top")[1]+pt("glabela")[1])//2))
-    label("Terco Med", (pt("glabela")[0]+5, (pt("glabela")[1]+pt("nasal_base")[1])//2))
-    label("Terco Inf", (pt("nasal_base")[0]+5, (pt("nasal_base")[1]+pt("chin")[1])//2))
+    label("Terco Sup", (pt(R.GLABELA)[0]+5, (pt(R.FOREHEAD_TOP)[1]+pt(R.GLABELA)[1])//2))
+    label("Terco Med", (pt(R.GLABELA)[0]+5, (pt(R.GLABELA)[1]+pt(R.NASAL_BASE)[1])//2))
+    label("Terco Inf", (pt(R.NASAL_BASE)[0]+5, (pt(R.NASAL_BASE)[1]+pt(R.CHIN)[1])//2))
 
     # Largura do rosto
-    line("jaw_left","jaw_right", (255,200,0), 2)
+    line(R.JAW_LEFT, R.JAW_RIGHT, (255,200,0), 2)
 
     return img
 
@@ -355,98 +455,569 @@ def print_report(m: FacialMetrics):
     print("="*60 + "\n")
 
 
+# ---------------------------------------------------------------------------
+# Gráficos
+# ---------------------------------------------------------------------------
+
+# Paleta do gráfico em BGR (#1a1a2e, #16213e, #e94560, #0f3460, #533483)
+_CHART_BG     = (46, 26, 26)
+_CHART_PANEL  = (62, 33, 22)
+_CHART_RED    = (96, 69, 233)
+_CHART_BLUE   = (96, 52, 15)
+_CHART_PURPLE = (131, 52, 83)
+_CHART_WHITE  = (255, 255, 255)
+
+
+def _draw_bar_panel(canvas: np.ndarray, x0: int, title: str, labels: list[str],
+                    values: list[float], colors: list[tuple], ideal: float) -> None:
+    """Desenha um painel de barras com linha tracejada do valor ideal."""
+    ch, cw = canvas.shape[0], canvas.shape[1] // 2
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    left, right, top, bottom = x0 + 60, x0 + cw - 20, 60, ch - 60
+    cv2.rectangle(canvas, (left, top), (right, bottom), _CHART_PANEL, -1)
+
+    ymax = max(max(values), ideal) * 1.15
+    def y_of(v): return int(bottom - max(v, 0) / ymax * (bottom - top))
+
+    slot = (right - left) / len(values)
+    for i, (lab, val, color) in enumerate(zip(labels, values, colors)):
+        bx0 = int(left + i * slot + slot * 0.15)
+        bx1 = int(left + (i + 1) * slot - slot * 0.15)
+        cv2.rectangle(canvas, (bx0, y_of(val)), (bx1, bottom), color, -1)
+        cv2.rectangle(canvas, (bx0, y_of(val)), (bx1, bottom), _CHART_WHITE, 1)
+        for text, y, scale in ((f"{val:.1f}%", y_of(val) - 8, 0.5), (lab, bottom + 25, 0.5)):
+            (tw, _), _ = cv2.getTextSize(text, font, scale, 1)
+            cv2.putText(canvas, text, ((bx0 + bx1 - tw) // 2, y), font, scale,
+                        _CHART_WHITE, 1, cv2.LINE_AA)
+
+    y_ideal = y_of(ideal)
+    for x in range(left, right, 14):
+        cv2.line(canvas, (x, y_ideal), (min(x + 7, right), y_ideal), _CHART_WHITE, 1, cv2.LINE_AA)
+    cv2.putText(canvas, f"Ideal ({ideal:g}%)", (right - 130, y_ideal - 8), font, 0.45,
+                _CHART_WHITE, 1, cv2.LINE_AA)
+
+    cv2.line(canvas, (left, top), (left, bottom), _CHART_WHITE, 1)
+    cv2.line(canvas, (left, bottom), (right, bottom), _CHART_WHITE, 1)
+    (tw, _), _ = cv2.getTextSize(title, font, 0.8, 2)
+    cv2.putText(canvas, title, ((left + right - tw) // 2, top - 20), font, 0.8,
+                _CHART_WHITE, 2, cv2.LINE_AA)
+
+
+def render_chart_cv(metrics: FacialMetrics) -> np.ndarray:
+    """Gráfico de terços e quintos desenhado só com OpenCV (imagem BGR)."""
+    canvas = np.full((600, 1500, 3), _CHART_BG, dtype=np.uint8)
+    thirds = [metrics.third_upper_pct, metrics.third_middle_pct, metrics.third_lower_pct]
+    fifths = [metrics.fifth_1_pct, metrics.fifth_2_pct, metrics.fifth_3_pct,
+              metrics.fifth_4_pct, metrics.fifth_5_pct]
+    _draw_bar_panel(canvas, 0, "Tercos Faciais", ["Superior", "Medio", "Inferior"], thirds,
+                    [_CHART_RED, _CHART_BLUE, _CHART_PURPLE], 33.3)
+    _draw_bar_panel(canvas, 750, "Quintos Faciais",
+                    ["Ext Esq", "Olho Esq", "Central", "Olho Dir", "Ext Dir"], fifths,
+                    [_CHART_RED, _CHART_BLUE, _CHART_PURPLE, _CHART_BLUE, _CHART_RED], 20)
+    return canvas
+
+
+@functools.lru_cache(maxsize=1)
+def _chart_figure():
+    """Figure com canvas Agg criada uma vez e reaproveitada entre gráficos, sem pyplot."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 4))
+    FigureCanvasAgg(fig)
+    return fig
+
+
+# A Figure compartilhada só pode desenhar um gráfico por vez
+_CHART_LOCK = threading.Lock()
+
+
+def render_chart_mpl(metrics: FacialMetrics, chart_path: str) -> None:
+    """Versão matplotlib do gráfico; o import só acontece quando ela é pedida."""
+    fig = _chart_figure()
+    with _CHART_LOCK:
+        fig.clear()
+        fig.patch.set_facecolor("#1a1a2e")
+        axes = fig.subplots(1, 2)
+
+        ax = axes[0]
+        ax.set_facecolor("#16213e")
+        thirds = [metrics.third_upper_pct, metrics.third_middle_pct, metrics.third_lower_pct]
+        colors = ["#e94560", "#0f3460", "#533483"]
+        bars = ax.bar(["Superior", "Médio", "Inferior"], thirds, color=colors, edgecolor="white", linewidth=0.5)
+        ax.axhline(33.3, color="white", linestyle="--", linewidth=1, alpha=0.7, label="Ideal (33%)")
+        ax.set_title("Terços Faciais", color="white", fontsize=12)
+        ax.set_ylabel("% da altura facial", color="white")
+        ax.tick_params(colors="white")
+        ax.legend(facecolor="#1a1a2e", labelcolor="white")
+        for bar, val in zip(bars, thirds):
+            ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5,
+                    f"{val:.1f}%", ha="center", color="white", fontsize=9)
+
+        ax2 = axes[1]
+        ax2.set_facecolor("#16213e")
+        fifths = [metrics.fifth_1_pct, metrics.fifth_2_pct, metrics.fifth_3_pct,
+                  metrics.fifth_4_pct, metrics.fifth_5_pct]
+        labels_f = ["Ext\nEsq", "Olho\nEsq", "Central", "Olho\nDir", "Ext\nDir"]
+        bars2 = ax2.bar(labels_f, fifths, color=["#e94560","#0f3460","#533483","#0f3460","#e94560"],
+                        edgecolor="white", linewidth=0.5)
+        ax2.axhline(20, color="white", linestyle="--", linewidth=1, alpha=0.7, label="Ideal (20%)")
+        ax2.set_title("Quintos Faciais", color="white", fontsize=12)
+        ax2.set_ylabel("% da largura facial", color="white")
+        ax2.tick_params(colors="white")
+        ax2.legend(facecolor="#1a1a2e", labelcolor="white")
+        for bar, val in zip(bars2, fifths):
+            ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.3,
+                    f"{val:.1f}%", ha="center", color="white", fontsize=8)
+
+        fig.tight_layout()
+        fig.savefig(chart_path, facecolor="#1a1a2e", dpi=150)
+
+
+# ---------------------------------------------------------------------------
+# Backend ONNX
+# ---------------------------------------------------------------------------
+
+class _FaceMeshONNX:
+    """Modelo de landmarks do FaceMesh exportado para ONNX, rodando no ONNXRuntime.
+
+    Expõe o mesmo process(rgb) das soluções do MediaPipe, com os landmarks do
+    rosto como matriz (N, 3) normalizada. Sem o detector de rosto da pipeline
+    original, o modelo recebe a foto inteira em 192x192: use com fotos de
+    rosto enquadrado (retrato clínico).
+    """
+
+    INPUT_SIZE = 192
+    N_MESH = 468
+
+    def __init__(self, model_path: str, min_face_score: float = 0.5):
+        import onnxruntime as ort
+
+        # GPU quando disponível, CPU como fallback
+        available = ort.get_available_providers()
+        providers = [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in available]
+        self.session = ort.InferenceSession(model_path, providers=providers)
+        model_input = self.session.get_inputs()[0]
+        if not self._is_nhwc_input(model_input.shape):
+            raise ValueError(
+                f"{model_path}: entrada {model_input.name} tem forma {model_input.shape}; "
+                f"esperado NHWC (B, {self.INPUT_SIZE}, {self.INPUT_SIZE}, 3)")
+        self.input_name = model_input.name
+        # Exportações com batch fixo em 1 não aceitam (B, 192, 192, 3)
+        self.fixed_batch = model_input.shape[0] == 1
+        self.min_face_score = min_face_score
+
+    @classmethod
+    def _is_nhwc_input(cls, shape: list) -> bool:
+        # Dimensões simbólicas (str/None) são aceitas; as fixas têm de bater
+        if len(shape) != 4 or shape[3] != 3:
+            return False
+        return all(not isinstance(d, int) or d == cls.INPUT_SIZE for d in shape[1:3])
+
+    def _preprocess(self, rgb: np.ndarray) -> np.ndarray:
+        size = self.INPUT_SIZE
+        tensor = cv2.resize(rgb, (size, size), interpolation=cv2.INTER_AREA)
+        return tensor.astype(np.float32) / 255.0
+
+    def _postprocess(self, outputs: list[np.ndarray]) -> list[Optional[np.ndarray]]:
+        """Separa a malha (B, 468*3) e o logit de presença de rosto (B, 1) das saídas."""
+        batch = outputs[0].shape[0]
+        flat = [o.reshape(batch, -1) for o in outputs]
+        mesh = next((o for o in flat if o.shape[1] == self.N_MESH * 3), None)
+        if mesh is None:
+            raise ValueError(
+                f"Saídas do modelo ONNX com formas {[o.shape for o in outputs]}; esperado "
+                f"uma malha de {self.N_MESH} pontos (B, {self.N_MESH * 3}) e, opcionalmente, "
+                "o logit de presença de rosto (B, 1)")
+        score = next((o for o in flat if o.shape[1] == 1), None)
+
+        faces = []
+        for i in range(batch):
+            if score is not None and 1 / (1 + math.exp(-score[i, 0])) < self.min_face_score:
+                faces.append(None)
+                continue
+            pts = mesh[i].reshape(self.N_MESH, 3).astype(np.float64)
+            pts /= self.INPUT_SIZE
+            faces.append(pts)
+        return faces
+
+    def process_batch(self, rgbs: list[np.ndarray]) -> list[Optional[np.ndarray]]:
+        """Infere várias fotos numa única chamada (B, 192, 192, 3); None onde não há rosto."""
+        batch = np.stack([self._preprocess(rgb) for rgb in rgbs])
+        if self.fixed_batch:
+            return [self._postprocess(self.session.run(None, {self.input_name: t[None]}))[0]
+                    for t in batch]
+        return self._postprocess(self.session.run(None, {self.input_name: batch}))
+
+    def process(self, rgb: np.ndarray) -> SimpleNamespace:
+        face = self.process_batch([rgb])[0]
+        return SimpleNamespace(multi_face_landmarks=None if face is None else [face])
+
+
+@functools.lru_cache(maxsize=2)
+def _get_facemesh_onnx(model_path: str) -> _FaceMeshONNX:
+    return _FaceMeshONNX(model_path)
+
+
 # ---------------------------------------------------------------------------
 # Pipeline principal
 # ---------------------------------------------------------------------------
 
-def analyze(image_path: str, save_annotated: Optional[str] = None):
-    mp_face = mp.solutions.face_mesh
+# Maior lado (px) da imagem entregue ao FaceMesh
+INFERENCE_MAX_SIDE = 640
+
+# Fotos por inferência no backend ONNX (limita a memória de um lote grande)
+ONNX_BATCH_SIZE = 16
+
+# MediaPipe não é thread-safe: toda chamada a FaceMesh.process passa por este lock
+_FACEMESH_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=4)
+def _get_facemesh(refine: bool = True, conf: float = 0.5, static: bool = True):
+    """FaceMesh persistente por configuração — evita recarregar o modelo a cada foto."""
+    import mediapipe as mp
+
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=static,
+        max_num_faces=1,
+        refine_landmarks=refine,
+        min_detection_confidence=conf,
+    )
+
 
-    image = cv2.imread(image_path)
+def _jpeg_size(image_path: str) -> Optional[tuple[int, int]]:
+    """(largura, altura) lidas do marcador SOF de um JPEG; None se não for JPEG."""
+    try:
+        with open(image_path, "rb") as f:
+            if f.read(2) != b"\xff\xd8":
+                return None
+            while True:
+                if f.read(1) != b"\xff":
+                    return None
+                marker = f.read(1)
+                while marker == b"\xff":          # bytes de preenchimento
+                    marker = f.read(1)
+                if not marker:
+                    return None
+                m = marker[0]
+                if m == 0x01 or 0xD0 <= m <= 0xD9:  # marcadores sem segmento
+                    continue
+                length = int.from_bytes(f.read(2), "big")
+                # SOF0..SOF15, exceto DHT (C4), JPG (C8) e DAC (CC)
+                if 0xC0 <= m <= 0xCF and m not in (0xC4, 0xC8, 0xCC):
+                    sof = f.read(5)
+                    if len(sof) < 5:
+                        return None
+                    return int.from_bytes(sof[3:5], "big"), int.from_bytes(sof[1:3], "big")
+                if length < 2:
+                    return None
+                f.seek(length - 2, os.SEEK_CUR)
+    except OSError:
+        return None
+
+
+def _read_image(image_path: str) -> tuple[np.ndarray, tuple[int, int]]:
+    """Lê a foto em BGR e devolve (imagem, (largura, altura) da foto original).
+
+    JPEGs com pelo menos o dobro de INFERENCE_MAX_SIDE no maior lado são
+    decodificados direto a 1/2 da resolução: o libjpeg faz isso no próprio
+    IDCT, e a inferência roda em INFERENCE_MAX_SIDE de qualquer forma. Outros
+    formatos não têm esse atalho e são lidos inteiros.
+    """
+    size = _jpeg_size(image_path)
+    reduce = size is not None and max(size) >= 2 * INFERENCE_MAX_SIDE
+    image = cv2.imread(image_path, cv2.IMREAD_REDUCED_COLOR_2 if reduce else cv2.IMREAD_COLOR)
     if image is None:
         raise FileNotFoundError(f"Imagem não encontrada: {image_path}")
 
     h, w = image.shape[:2]
-    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    if not reduce:
+        return image, (w, h)
+    # A orientação EXIF é aplicada na leitura: o cabeçalho pode estar girado 90°
+    sw, sh = size
+    if (sw > sh) != (w > h) and sw != sh:
+        sw, sh = sh, sw
+    return image, (sw, sh)
+
+
+def _inference_rgb(image: np.ndarray) -> np.ndarray:
+    """Cópia RGB da imagem BGR com o maior lado limitado a INFERENCE_MAX_SIDE."""
+    h, w = image.shape[:2]
+    # Os landmarks saem normalizados em [0, 1]: inferir numa cópia reduzida
+    # e escalar pelas dimensões originais dá as mesmas coordenadas em pixels
+    scale = INFERENCE_MAX_SIDE / max(h, w)
+    if scale < 1:
+        # A cópia reduzida é só nossa: converte para RGB no próprio buffer
+        rgb = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(rgb, cv2.COLOR_BGR2RGB, dst=rgb)
+        return rgb
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def _detect(face_mesh, image: np.ndarray) -> Optional[Landmarks]:
+    """Roda o FaceMesh numa imagem BGR e devolve os landmarks do primeiro rosto."""
+    h, w = image.shape[:2]
+    results = face_mesh.process(_inference_rgb(image))
+    if not results.multi_face_landmarks:
+        return None
+    return Landmarks.from_result(results.multi_face_landmarks[0], w, h)
+
+
+def analyze(image_path: str, save_annotated: Optional[str] = None, chart: Optional[str] = None,
+            onnx_model: Optional[str] = None):
+    """Analisa uma foto; seguro entre threads, mas as inferências do MediaPipe são serializadas.
+
+    onnx_model: caminho de um face_landmark .onnx para usar o ONNXRuntime
+    no lugar do MediaPipe (ver _FaceMeshONNX).
+    """
+    image, source_size = _read_image(image_path)
+
+    if onnx_model is not None:
+        lm = _detect(_get_facemesh_onnx(onnx_model), image)
+    else:
+        with _FACEMESH_LOCK:
+            lm = _detect(_get_facemesh(), image)
+
+    if lm is None:
+        print("⚠ Nenhum rosto detectado na imagem.")
+        return
 
-    with mp_face.FaceMesh(
-        static_image_mode=True,
+    return _report(image_path, image, lm, save_annotated, chart, source_size)
+
+
+def batch_analyze(image_paths, subject_hint_ordered: bool = True, chart: Optional[str] = None,
+                  onnx_model: Optional[str] = None) -> dict[str, Optional[FacialMetrics]]:
+    """Analisa várias fotos da mesma sessão com o FaceMesh em modo vídeo.
+
+    Fora do modo estático o detector só roda quando o rastreamento do rosto
+    se perde; nas demais fotos o ROI da anterior é reaproveitado. Com
+    subject_hint_ordered as fotos são ordenadas pelo caminho, mantendo a
+    sequência da sessão.
+    """
+    paths = sorted(image_paths) if subject_hint_ordered else list(image_paths)
+    out: dict[str, Optional[FacialMetrics]] = {}
+
+    if onnx_model is not None:
+        return _batch_analyze_onnx(paths, _get_facemesh_onnx(onnx_model), chart)
+
+    import mediapipe as mp
+
+    # Instância própria: o estado de rastreamento não deve vazar entre lotes
+    with mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=False,
         max_num_faces=1,
         refine_landmarks=True,
         min_detection_confidence=0.5,
     ) as face_mesh:
-        results = face_mesh.process(rgb)
+        for path in paths:
+            image, source_size = _read_image(path)
+            lm = _detect(face_mesh, image)
+            if lm is None:
+                print(f"⚠ Nenhum rosto detectado em: {path}")
+                out[path] = None
+                continue
+            out[path] = _report(path, image, lm, chart=chart, source_size=source_size)
+
+    return out
+
+
+def _batch_analyze_onnx(paths: list[str], face_mesh: _FaceMeshONNX,
+                        chart: Optional[str] = None) -> dict[str, Optional[FacialMetrics]]:
+    """Lote no ONNXRuntime: uma inferência por bloco de ONNX_BATCH_SIZE fotos.
+
+    Decodificação, redução e conversão para RGB rodam num pool de threads
+    (o cv2 libera o GIL); relatórios e arquivos saem na ordem das fotos.
+    """
+    out: dict[str, Optional[FacialMetrics]] = {}
+    with ThreadPoolExecutor() as pool:
+        for start in range(0, len(paths), ONNX_BATCH_SIZE):
+            chunk = paths[start:start + ONNX_BATCH_SIZE]
+            loaded = list(pool.map(_load_for_inference, chunk))
+            faces = face_mesh.process_batch([rgb for _, _, rgb in loaded])
+
+            for path, (image, source_size, _), face in zip(chunk, loaded, faces):
+                if face is None:
+                    print(f"⚠ Nenhum rosto detectado em: {path}")
+                    out[path] = None
+                    continue
+                lm = Landmarks.from_result(face, image.shape[1], image.shape[0])
+                out[path] = _report(path, image, lm, chart=chart, source_size=source_size)
+    return out
+
+
+def _load_for_inference(image_path: str) -> tuple[np.ndarray, tuple[int, int], np.ndarray]:
+    """_read_image seguido de _inference_rgb, para rodar inteiro no pool."""
+    image, source_size = _read_image(image_path)
+    return image, source_size, _inference_rgb(image)
+
+
+def _source_metrics(image: np.ndarray, lm: Landmarks,
+                    source_size: Optional[tuple[int, int]] = None) -> FacialMetrics:
+    """Métricas em pixels da foto original, mesmo quando ela foi decodificada reduzida."""
+    h, w = image.shape[:2]
+    sw, sh = source_size or (w, h)
+    return extract_metrics(Landmarks(lm.xy * (sw / w, sh / h)), sw, sh)
 
-    if not results.multi_face_landmarks:
-        print("⚠ Nenhum rosto detectado na imagem.")
-        return
 
-    lm = results.multi_face_landmarks[0]
-    metrics = extract_metrics(lm, w, h)
+def _report(image_path: str, image: np.ndarray, lm: Landmarks,
+            save_annotated: Optional[str] = None, chart: Optional[str] = None,
+            source_size: Optional[tuple[int, int]] = None) -> FacialMetrics:
+    """Calcula as métricas e grava relatório, JSON, imagem anotada e, se pedido, o gráfico.
+
+    chart: None (sem gráfico), "cv" (OpenCV) ou "mpl" (matplotlib).
+    source_size: (largura, altura) da foto original quando ela foi
+    decodificada reduzida; as métricas em px continuam referidas a ela.
+    """
+    h, w = image.shape[:2]
+    metrics = _source_metrics(image, lm, source_size)
     print_report(metrics)
 
     # Salvar JSON
     json_path = image_path.rsplit(".", 1)[0] + "_metrics.json"
-    with open(json_path, "w") as f:
-        json.dump(asdict(metrics), f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        # orjson serializa o dataclass direto, sem a cópia de asdict
+        with open(json_path, "wb") as f:
+            f.write(orjson.dumps(metrics, option=orjson.OPT_INDENT_2))
+    else:
+        with open(json_path, "w") as f:
+            json.dump(asdict(metrics), f, indent=2, ensure_ascii=False)
     print(f"  Métricas salvas em: {json_path}")
 
     # Imagem anotada
     annotated = draw_annotations(image, lm, w, h)
-    out_path = save_annotated or image_path.rsplit(".", 1)[0] + "_annotated.jpg"
+    # Sufixo _r2 quando a anotação foi feita sobre a imagem reduzida à metade
+    reduced = source_size is not None and source_size != (w, h)
+    suffix = "_annotated_r2.jpg" if reduced else "_annotated.jpg"
+    out_path = save_annotated or image_path.rsplit(".", 1)[0] + suffix
     cv2.imwrite(out_path, annotated)
     print(f"  Imagem anotada salva em: {out_path}")
 
-    # Plot comparativo dos terços
-    fig, axes = plt.subplots(1, 2, figsize=(10, 4))
-    fig.patch.set_facecolor("#1a1a2e")
-
-    ax = axes[0]
-    ax.set_facecolor("#16213e")
-    thirds = [metrics.third_upper_pct, metrics.third_middle_pct, metrics.third_lower_pct]
-    colors = ["#e94560", "#0f3460", "#533483"]
-    bars = ax.bar(["Superior", "Médio", "Inferior"], thirds, color=colors, edgecolor="white", linewidth=0.5)
-    ax.axhline(33.3, color="white", linestyle="--", linewidth=1, alpha=0.7, label="Ideal (33%)")
-    ax.set_title("Terços Faciais", color="white", fontsize=12)
-    ax.set_ylabel("% da altura facial", color="white")
-    ax.tick_params(colors="white")
-    ax.legend(facecolor="#1a1a2e", labelcolor="white")
-    for bar, val in zip(bars, thirds):
-        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5,
-                f"{val:.1f}%", ha="center", color="white", fontsize=9)
-
-    ax2 = axes[1]
-    ax2.set_facecolor("#16213e")
-    fifths = [metrics.fifth_1_pct, metrics.fifth_2_pct, metrics.fifth_3_pct,
-              metrics.fifth_4_pct, metrics.fifth_5_pct]
-    labels_f = ["Ext\nEsq", "Olho\nEsq", "Central", "Olho\nDir", "Ext\nDir"]
-    bars2 = ax2.bar(labels_f, fifths, color=["#e94560","#0f3460","#533483","#0f3460","#e94560"],
-                    edgecolor="white", linewidth=0.5)
-    ax2.axhline(20, color="white", linestyle="--", linewidth=1, alpha=0.7, label="Ideal (20%)")
-    ax2.set_title("Quintos Faciais", color="white", fontsize=12)
-    ax2.set_ylabel("% da largura facial", color="white")
-    ax2.tick_params(colors="white")
-    ax2.legend(facecolor="#1a1a2e", labelcolor="white")
-    for bar, val in zip(bars2, fifths):
-        ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.3,
-                f"{val:.1f}%", ha="center", color="white", fontsize=8)
-
-    plt.tight_layout()
-    chart_path = image_path.rsplit(".", 1)[0] + "_chart.png"
-    plt.savefig(chart_path, facecolor="#1a1a2e", dpi=150)
-    plt.close()
-    print(f"  Gráfico salvo em: {chart_path}\n")
+    # Gráfico comparativo dos terços e quintos
+    if chart is not None:
+        chart_path = image_path.rsplit(".", 1)[0] + "_chart.png"
+        if chart == "mpl":
+            render_chart_mpl(metrics, chart_path)
+        else:
+            cv2.imwrite(chart_path, render_chart_cv(metrics))
+        print(f"  Gráfico salvo em: {chart_path}\n")
 
     return metrics
 
 
+# ---------------------------------------------------------------------------
+# Pipeline distribuído (Ray Data)
+# ---------------------------------------------------------------------------
+
+# Extensões lidas por ray_batch_analyze; outros arquivos da pasta são ignorados
+RAY_IMAGE_EXTENSIONS = ["jpg", "jpeg", "png"]
+
+
+def _ray_decode(row: dict) -> list[dict]:
+    """Estágio de CPU: bytes do arquivo → cópia RGB de inferência.
+
+    Só a RGB reduzida segue para o FaceMesh; a foto em resolução cheia é
+    decodificada de novo a partir dos bytes em _ray_metrics. Arquivos que
+    não decodificam são descartados (lista vazia) em vez de abortar o job.
+    """
+    image = cv2.imdecode(np.frombuffer(row["bytes"], dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        print(f"⚠ Imagem inválida, ignorada: {row['path']}")
+        return []
+    return [{"path": row["path"], "bytes": row["bytes"], "rgb": _inference_rgb(image)}]
+
+
+class _FaceMeshActor:
+    """Único estágio com estado do pipeline Ray: uma sessão do FaceMesh por worker.
+
+    Acrescenta os landmarks normalizados (N, 2) de cada foto e descarta as
+    fotos em que nenhum rosto foi detectado.
+    """
+
+    def __init__(self, onnx_model: Optional[str] = None):
+        self.face_mesh = _get_facemesh_onnx(onnx_model) if onnx_model else _get_facemesh()
+
+    def __call__(self, batch: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        rgbs = list(batch.pop("rgb"))
+        if isinstance(self.face_mesh, _FaceMeshONNX):
+            faces = self.face_mesh.process_batch(rgbs)
+        else:
+            faces = []
+            for rgb in rgbs:
+                results = self.face_mesh.process(rgb)
+                faces.append(Landmarks.from_result(results.multi_face_landmarks[0], 1, 1).xy
+                             if results.multi_face_landmarks else None)
+
+        found = [i for i, f in enumerate(faces) if f is not None]
+        landmarks = np.empty(len(found), dtype=object)
+        landmarks[:] = [faces[i][:, :2] for i in found]
+        out = {k: v[found] for k, v in batch.items()}
+        out["landmarks"] = landmarks
+        return out
+
+
+def _ray_metrics(row: dict) -> dict:
+    """Estágio final: métricas + imagem anotada (JPEG) de uma foto."""
+    image = cv2.imdecode(np.frombuffer(row["bytes"], dtype=np.uint8), cv2.IMREAD_COLOR)
+    h, w = image.shape[:2]
+    lm = Landmarks.from_result(row["landmarks"], w, h)
+    metrics = extract_metrics(lm, w, h)
+    _, annotated = cv2.imencode(".jpg", draw_annotations(image, lm, w, h))
+    return {"path": row["path"], **asdict(metrics), "annotated_jpg": annotated.tobytes()}
+
+
+def ray_batch_analyze(source, output: str, onnx_model: Optional[str] = None,
+                      batch_size: int = 8, num_actors: int = 2, num_gpus: float = 0.0) -> None:
+    """Analisa muitas fotos num pipeline Ray Data e grava as métricas em Parquet.
+
+    leitura → decodificação (CPU) → FaceMesh (_FaceMeshActor, GPU se
+    num_gpus > 0) → métricas/anotação → Parquet. source é qualquer caminho
+    aceito por ray.data.read_binary_files (pasta local, s3://...); só
+    arquivos RAY_IMAGE_EXTENSIONS são lidos, e fotos inválidas ou sem rosto
+    são descartadas.
+    """
+    import ray
+
+    (
+        ray.data.read_binary_files(source, include_paths=True,
+                                   file_extensions=RAY_IMAGE_EXTENSIONS)
+        .flat_map(_ray_decode)
+        .map_batches(
+            _FaceMeshActor,
+            fn_constructor_kwargs={"onnx_model": onnx_model},
+            batch_size=batch_size,
+            compute=ray.data.ActorPoolStrategy(size=num_actors),
+            num_gpus=num_gpus,
+        )
+        .map(_ray_metrics)
+        .write_parquet(output)
+    )
+
+
 # ---------------------------------------------------------------------------
 # Execução
 # ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Avaliação Estética Facial — MediaPipe Face Mesh")
-    parser.add_argument("--image", required=True, help="Caminho para a foto (.jpg / .png)")
-    parser.add_argument("--output", default=None, help="Caminho da imagem anotada de saída")
+    parser.add_argument("--image", required=True, nargs="+",
+                        help="Caminho para a foto (.jpg / .png); aceita várias fotos")
+    parser.add_argument("--session", action="store_true",
+                        help="As fotos são da mesma pessoa e sessão: rastreia o rosto entre elas (modo vídeo)")
+    parser.add_argument("--output", default=None, help="Caminho da imagem anotada de saída (apenas uma foto)")
+    parser.add_argument("--chart", nargs="?", const="cv", choices=["cv", "mpl"], default=None,
+                        help="Salva o gráfico de terços/quintos (cv = OpenCV, padrão; mpl = matplotlib)")
+    parser.add_argument("--onnx-model", default=None,
+                        help="Modelo face_landmark .onnx para inferir com ONNXRuntime em vez do MediaPipe")
     args = parser.parse_args()
-    analyze(args.image, args.output)
+    if args.output is not None and len(args.image) > 1:
+        parser.error("--output só pode ser usado com uma única foto")
+    if len(args.image) == 1:
+        analyze(args.image[0], args.output, args.chart, args.onnx_model)
+    elif args.session or args.onnx_model is not None:
+        # O ONNX não rastreia entre fotos: o lote só agrupa a inferência
+        batch_analyze(args.image, chart=args.chart, onnx_model=args.onnx_model)
+    else:
+        # Fotos independentes: modo estático, detector completo em cada uma
+        for path in args.image:
+            analyze(path, chart=args.chart)